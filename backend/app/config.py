@@ -10,6 +10,14 @@ class Settings:
     # MongoDB Configuration
     MONGODB_URI: str = os.getenv("MONGODB_URI", "")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "PersonalCFO")
+    # Connection pool (per process). Sync route handlers run in FastAPI's threadpool
+    # (40 threads by default), so keep the max pool size at or above that.
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "10"))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "30000"))
+    
+    # Invoice numbers reserved per counter update (1 = strictly sequential, one update per invoice)
+    INVOICE_NUMBER_BLOCK_SIZE: int = int(os.getenv("INVOICE_NUMBER_BLOCK_SIZE", "1"))
     
     # API Configuration
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
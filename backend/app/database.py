@@ -11,6 +11,8 @@ class Database:
     def __init__(self):
         self.client = None
         self.db = None
+        # Collection handles, built once per connection and reused by every request
+        self._collections = {}
     
     def connect(self):
         """Connect to MongoDB Atlas"""
@@ -20,7 +22,15 @@ class Database:
             # Create MongoDB client
             self.client = MongoClient(
                 settings.MONGODB_URI,
-                serverSelectionTimeoutMS=5000  # 5 second timeout
+                serverSelectionTimeoutMS=5000,  # 5 second timeout
+                # One shared pool per process, sized for the threadpool that runs the routes
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                # Compress traffic to the cluster; the server picks the first one it supports
+                # (zstd needs the pymongo[zstd] extra, zlib is always available)
+                compressors="zstd,zlib",
+                zlibCompressionLevel=6
             )
             
             # Test the connection
@@ -28,6 +38,7 @@ class Database:
             
             # Get database
             self.db = self.client[settings.DATABASE_NAME]
+            self._collections = {}
             
             logger.info(f"✅ Connected to MongoDB database: {settings.DATABASE_NAME}")
             
@@ -52,17 +63,44 @@ class Database:
             logger.error(f"❌ Unexpected error connecting to MongoDB: {e}")
             raise
     
+    def ensure_indexes(self):
+        """Create the indexes the routes filter on (no-op if they already exist)"""
+        if self.db is None:
+            raise Exception("Database not connected. Call connect() first.")
+        try:
+            # Client relationship endpoints and list filters use clientId (+ status);
+            # these also serve clientId-only queries as a prefix
+            self.db.jobs.create_index([("clientId", 1), ("status", 1)])
+            self.db.invoices.create_index([("clientId", 1), ("status", 1)])
+            # Invoice/job lists and the overdue check filter by owner (+ status)
+            self.db.invoices.create_index([("userId", 1), ("status", 1)])
+            self.db.jobs.create_index([("userId", 1), ("status", 1)])
+            # Foreign keys used by the invoice <-> job joins
+            self.db.invoices.create_index([("jobId", 1)])
+            self.db.jobs.create_index([("invoiceId", 1)])
+            # Client listing filters by owner
+            self.db.clients.create_index([("userId", 1)])
+            logger.info("✅ MongoDB indexes ensured")
+        except Exception as e:
+            # Missing indexes only cost performance, so don't block startup
+            logger.warning(f"⚠️ Could not create MongoDB indexes: {e}")
+    
     def close(self):
         """Close MongoDB connection"""
         if self.client:
             self.client.close()
+            self.db = None
+            self._collections = {}
             logger.info("MongoDB connection closed")
     
     def get_collection(self, collection_name: str):
         """Get a specific collection from the database"""
-        if self.db is None:
-            raise Exception("Database not connected. Call connect() first.")
-        return self.db[collection_name]
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            if self.db is None:
+                raise Exception("Database not connected. Call connect() first.")
+            collection = self._collections[collection_name] = self.db[collection_name]
+        return collection
     
     # Collection shortcuts
     @property
@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import logging
 
 from .database import db
@@ -34,6 +35,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Compress larger responses (PDFs, invoice/job lists)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Startup event - connect to database
 @app.on_event("startup")
 async def startup_event():
@@ -46,6 +50,7 @@ async def startup_event():
         
         # Connect to database
         db.connect()
+        db.ensure_indexes()
         
         logger.info("✅ API ready to accept requests!")
         
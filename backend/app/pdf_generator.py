@@ -8,19 +8,195 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_RIGHT, TA_CENTER
 from reportlab.pdfbase.pdfmetrics import stringWidth
 from io import BytesIO
+import re
+from functools import lru_cache
+from collections import OrderedDict
 import base64
-from typing import Dict, Any
+import hashlib
+import json
+import threading
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 
-def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], client: Dict[str, Any]) -> BytesIO:
+# Line items whose description matches are billed under SERVICES, the rest under MATERIALS
+_SERVICE_RE = re.compile(r'labor|hour|service|time', re.IGNORECASE)
+
+# Rendered PDFs, one entry per invoice: {invoice_key: (content_digest, pdf_bytes)}
+_PDF_CACHE_MAX = 256
+_pdf_cache: "OrderedDict[str, tuple[bytes, bytes]]" = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+
+# Per-thread reusable state for PDF builds (output buffer, business header cache)
+_TLS = threading.local()
+
+# ---------- Colors ----------
+_COLOR_PRIMARY = colors.HexColor('#667eea')
+_COLOR_TEXT = colors.HexColor('#333333')
+_COLOR_LIGHT = colors.HexColor('#666666')
+_COLOR_GRID = colors.HexColor('#eeeeee')
+_COLOR_ROW_BG = colors.HexColor('#f5f5f5')
+
+# ---------- Styles ----------
+# Built once at import: getSampleStyleSheet() and the ParagraphStyle objects
+# are identical for every invoice, so there is no reason to rebuild them per PDF.
+_STYLES = getSampleStyleSheet()
+
+_STYLE_TITLE = ParagraphStyle(
+    'Title', parent=_STYLES['Heading1'],
+    fontSize=20, textColor=_COLOR_TEXT, spaceAfter=2
+)
+_STYLE_NORMAL = ParagraphStyle(
+    'Normal', parent=_STYLES['Normal'],
+    fontSize=10, textColor=_COLOR_TEXT, leading=14
+)
+_STYLE_RIGHT_META = ParagraphStyle(
+    'RightMeta', parent=_STYLE_NORMAL,
+    alignment=TA_RIGHT, fontSize=10
+)
+_STYLE_LABEL_SMALL = ParagraphStyle(
+    'LabelSmall', parent=_STYLE_NORMAL,
+    textColor=_COLOR_LIGHT, fontSize=9
+)
+_STYLE_SECTION = ParagraphStyle(
+    'Section', parent=_STYLES['Heading2'],
+    fontSize=11, textColor=_COLOR_PRIMARY,
+    spaceBefore=12, spaceAfter=6, fontName='Helvetica-Bold'
+)
+
+# Money styles
+_STYLE_MONEY = ParagraphStyle(
+    'Money', parent=_STYLE_NORMAL, alignment=TA_RIGHT, fontSize=9, leading=12
+)
+
+# Mini-table styles (subtotals / totals)
+_STYLE_PAIR_LABEL = ParagraphStyle(
+    'PairLabel', parent=_STYLE_NORMAL,
+    alignment=TA_RIGHT, fontSize=10, leading=14,
+    textColor=_COLOR_TEXT, fontName='Helvetica-Bold'
+)
+_STYLE_PAIR_VALUE = ParagraphStyle(
+    'PairValue', parent=_STYLE_NORMAL,
+    alignment=TA_RIGHT, fontSize=10, leading=14,
+    textColor=_COLOR_TEXT, fontName='Helvetica-Bold'
+)
+_STYLE_TOTAL_LABEL = ParagraphStyle(
+    'TotalLabel', parent=_STYLE_NORMAL,
+    alignment=TA_RIGHT, fontSize=14, leading=16,
+    textColor=_COLOR_PRIMARY, fontName='Helvetica-Bold'
+)
+_STYLE_TOTAL_VALUE = ParagraphStyle(
+    'TotalValue', parent=_STYLE_NORMAL,
+    alignment=TA_RIGHT, fontSize=14, leading=16,
+    textColor=_COLOR_PRIMARY, fontName='Helvetica-Bold'
+)
+
+
+def safe_float(x) -> float:
+    # Mongo hands numeric fields back as int/float, so check those first and
+    # only pay for try/except on strings and other odd values.
+    t = type(x)
+    if t is float:
+        return x
+    if t is int:
+        return float(x)
+    if x is None or x == '':
+        return 0.0
+    try:
+        return float(x)
+    except Exception:
+        return 0.0
+
+
+_fmt_money = "${:,.2f}".format
+
+
+def format_currency(value) -> str:
+    t = type(value)
+    if t is float or t is int:
+        return _fmt_money(value)
+    try:
+        return _fmt_money(float(value))
+    except (ValueError, TypeError):
+        return "$0.00"
+
+
+def _fmt_float_qty(q: float) -> str:
+    return str(int(q)) if q.is_integer() else str(q)
+
+
+def format_qty(qty) -> str:
+    t = type(qty)
+    if t is float:
+        return _fmt_float_qty(qty)
+    if t is int:
+        return str(qty)
+    try:
+        return _fmt_float_qty(float(qty))
+    except Exception:
+        return "0"
+
+
+@lru_cache(maxsize=2048)
+def _cached_string_width(text: str, font: str, size: float) -> float:
+    """stringWidth() walks the font metric tables; labels and amounts repeat across invoices."""
+    return stringWidth(text, font, size)
+
+
+def _build_business_header(business_name, address, phone, email) -> tuple:
+    biz_info = [Paragraph(business_name, _STYLE_TITLE)]
+    if address:
+        biz_info.append(Paragraph(address, _STYLE_NORMAL))
+    if phone:
+        biz_info.append(Paragraph(phone, _STYLE_NORMAL))
+    if email:
+        biz_info.append(Paragraph(email, _STYLE_NORMAL))
+    return tuple(biz_info)
+
+
+def _business_header(user: Dict[str, Any]) -> list:
+    """
+    Business header paragraphs, cached per (name, address, phone, email).
+    Flowables keep layout state while a document builds, so the cache (like the
+    output buffer) is per thread and never shared between concurrent builds.
+    """
+    build = getattr(_TLS, "business_header", None)
+    if build is None:
+        build = _TLS.business_header = lru_cache(maxsize=64)(_build_business_header)
+    return list(build(
+        user.get('businessName', 'Invoice'),
+        user.get('businessAddress'),
+        user.get('businessPhone'),
+        user.get('businessEmail'),
+    ))
+
+
+def _thread_buffer() -> BytesIO:
+    """Per-thread output buffer, emptied and reused for each PDF build."""
+    buffer = getattr(_TLS, "buffer", None)
+    if buffer is None:
+        buffer = _TLS.buffer = BytesIO()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return buffer
+
+
+def create_pdf_document(
+    invoice_data: Dict[str, Any],
+    user: Dict[str, Any],
+    client: Dict[str, Any],
+    buffer: Optional[BytesIO] = None
+) -> BytesIO:
     """
     Fix for "smushed/overlapping subtotal/total labels":
     - NEVER place subtotal rows inside the 4-column line-items table.
     - ReportLab does NOT clip overflow text in table cells, so long labels will paint into adjacent cells.
     - Instead, render subtotals/totals as separate right-aligned 2-column mini-tables.
+
+    The PDF is written into `buffer` if one is given (it must be empty), otherwise into a new BytesIO.
     """
-    buffer = BytesIO()
+    if buffer is None:
+        buffer = BytesIO()
 
     doc = SimpleDocTemplate(
         buffer,
@@ -32,87 +208,8 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
     )
 
     elements = []
-    styles = getSampleStyleSheet()
-
-    # ---------- Colors ----------
-    color_primary = colors.HexColor('#667eea')
-    color_text = colors.HexColor('#333333')
-    color_light = colors.HexColor('#666666')
-    color_grid = colors.HexColor('#eeeeee')
-
-    # ---------- Styles ----------
-    style_title = ParagraphStyle(
-        'Title', parent=styles['Heading1'],
-        fontSize=20, textColor=color_text, spaceAfter=2
-    )
-    style_normal = ParagraphStyle(
-        'Normal', parent=styles['Normal'],
-        fontSize=10, textColor=color_text, leading=14
-    )
-    style_right_meta = ParagraphStyle(
-        'RightMeta', parent=style_normal,
-        alignment=TA_RIGHT, fontSize=10
-    )
-    style_label_small = ParagraphStyle(
-        'LabelSmall', parent=style_normal,
-        textColor=color_light, fontSize=9
-    )
-    style_section = ParagraphStyle(
-        'Section', parent=styles['Heading2'],
-        fontSize=11, textColor=color_primary,
-        spaceBefore=12, spaceAfter=6, fontName='Helvetica-Bold'
-    )
-
-    # Money styles
-    style_money = ParagraphStyle(
-        'Money', parent=style_normal, alignment=TA_RIGHT, fontSize=9, leading=12
-    )
-    style_money_bold = ParagraphStyle(
-        'MoneyBold', parent=style_money, fontName='Helvetica-Bold'
-    )
-
-    # Mini-table styles (subtotals / totals)
-    style_pair_label = ParagraphStyle(
-        'PairLabel', parent=style_normal,
-        alignment=TA_RIGHT, fontSize=10, leading=14,
-        textColor=color_text, fontName='Helvetica-Bold'
-    )
-    style_pair_value = ParagraphStyle(
-        'PairValue', parent=style_normal,
-        alignment=TA_RIGHT, fontSize=10, leading=14,
-        textColor=color_text, fontName='Helvetica-Bold'
-    )
-    style_total_label = ParagraphStyle(
-        'TotalLabel', parent=style_normal,
-        alignment=TA_RIGHT, fontSize=14, leading=16,
-        textColor=color_primary, fontName='Helvetica-Bold'
-    )
-    style_total_value = ParagraphStyle(
-        'TotalValue', parent=style_normal,
-        alignment=TA_RIGHT, fontSize=14, leading=16,
-        textColor=color_primary, fontName='Helvetica-Bold'
-    )
 
     # ---------- Helpers ----------
-    def safe_float(x) -> float:
-        try:
-            return float(x or 0)
-        except Exception:
-            return 0.0
-
-    def format_currency(value) -> str:
-        try:
-            return f"${float(value):,.2f}"
-        except (ValueError, TypeError):
-            return "$0.00"
-
-    def format_qty(qty) -> str:
-        try:
-            q = float(qty)
-            return str(int(q)) if q.is_integer() else str(q)
-        except Exception:
-            return "0"
-
     def format_date(date_val) -> str:
         if not date_val:
             return ""
@@ -149,7 +246,7 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
         widest_value = 0.0
         for s in (value_strings or ["$0.00"]):
             # Add 10% safety margin for bold fonts and rendering variations
-            text_width = stringWidth(s, font_value, size_value)
+            text_width = _cached_string_width(s, font_value, size_value)
             widest_value = max(widest_value, text_width * 1.1)
         
         # Ensure value column has enough space with generous padding
@@ -158,14 +255,14 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
 
         # label needs at least min_label_w; also consider actual label text width
         # Add safety margin for bold fonts
-        label_text_w = stringWidth(max_label_text, font_label, size_label) * 1.1 + 2 * pad_pts + 15
+        label_text_w = _cached_string_width(max_label_text, font_label, size_label) * 1.1 + 2 * pad_pts + 15
         label_w = max(min_label_w, label_text_w)
 
         total_w = label_w + value_w
         if total_w > max_total_w:
             # if too wide, squeeze label first (keep value width) but never below absolute minimum
             # Use a more conservative absolute minimum to prevent overlap
-            absolute_min_label = stringWidth(max_label_text, font_label, size_label) * 1.15 + 15
+            absolute_min_label = _cached_string_width(max_label_text, font_label, size_label) * 1.15 + 15
             overflow = total_w - max_total_w
             label_w = max(max(min_label_w, absolute_min_label), label_w - overflow)
             total_w = label_w + value_w
@@ -201,11 +298,11 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
         ]
 
         if line_above:
-            ts.append(('LINEABOVE', (0, 0), (-1, 0), 1, color_primary))
+            ts.append(('LINEABOVE', (0, 0), (-1, 0), 1, _COLOR_PRIMARY))
             ts.append(('TOPPADDING', (0, 0), (-1, 0), 10))
 
         if total_row_index is not None:
-            ts.append(('LINEABOVE', (0, total_row_index), (-1, total_row_index), 1, color_primary))
+            ts.append(('LINEABOVE', (0, total_row_index), (-1, total_row_index), 1, _COLOR_PRIMARY))
             ts.append(('TOPPADDING', (0, total_row_index), (-1, total_row_index), 10))
 
         t.setStyle(TableStyle(ts))
@@ -215,23 +312,25 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
     invoice = invoice_data.get('invoice', invoice_data)
     line_items = invoice.get('lineItems', []) or []
 
-    # Split items (same heuristic as yours)
-    services = [
-        i for i in line_items
-        if any(x in (i.get('description', '') or '').lower() for x in ['labor', 'hour', 'service', 'time'])
-    ]
-    materials = [i for i in line_items if i not in services]
-
-    def section_sum(items) -> float:
-        total = 0.0
-        for it in items:
-            qty = safe_float(it.get('quantity', 0))
-            rate = safe_float(it.get('rate', 0))
-            total += qty * rate
-        return total
-
-    total_services = section_sum(services)
-    total_materials = section_sum(materials)
+    # Split items (same heuristic as yours) and sum each section in a single pass.
+    # Each item's fields are read and parsed exactly once here; the rows are
+    # (description, qty, rate, amount) so the table builder never touches the dicts again.
+    services, materials = [], []
+    total_services = total_materials = 0.0
+    _sf = safe_float
+    _search = _SERVICE_RE.search
+    for it in line_items:
+        desc = it.get('description', '') or ''
+        qty = _sf(it.get('quantity', 0))
+        rate = _sf(it.get('rate', 0))
+        amt = qty * rate
+        if _search(desc):
+            services.append((desc, qty, rate, amt))
+            total_services += amt
+        else:
+            materials.append((desc, qty, rate, amt))
+            total_materials += amt
+
     subtotal = total_services + total_materials
 
     manual_total = safe_float(invoice.get('total', 0))
@@ -247,24 +346,18 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
     col_widths_items = [2.8 * inch, 0.8 * inch, 1.2 * inch, 1.7 * inch]
 
     # ---------- Header ----------
-    biz_info = [Paragraph(user.get('businessName', 'Invoice'), style_title)]
-    if user.get('businessAddress'):
-        biz_info.append(Paragraph(user['businessAddress'], style_normal))
-    if user.get('businessPhone'):
-        biz_info.append(Paragraph(user['businessPhone'], style_normal))
-    if user.get('businessEmail'):
-        biz_info.append(Paragraph(user['businessEmail'], style_normal))
+    biz_info = _business_header(user)
 
     inv_info = []
     inv_num = invoice.get('invoiceNumber', 'N/A')
-    inv_info.append(Paragraph("<b>INVOICE</b>", style_right_meta))
-    inv_info.append(Paragraph(f"Invoice #: {inv_num}", style_right_meta))
-    inv_info.append(Paragraph(f"Issue Date: {format_date(invoice.get('issueDate'))}", style_right_meta))
-    inv_info.append(Paragraph(f"Due Date: {format_date(invoice.get('dueDate'))}", style_right_meta))
+    inv_info.append(Paragraph("<b>INVOICE</b>", _STYLE_RIGHT_META))
+    inv_info.append(Paragraph(f"Invoice #: {inv_num}", _STYLE_RIGHT_META))
+    inv_info.append(Paragraph(f"Issue Date: {format_date(invoice.get('issueDate'))}", _STYLE_RIGHT_META))
+    inv_info.append(Paragraph(f"Due Date: {format_date(invoice.get('dueDate'))}", _STYLE_RIGHT_META))
 
     status = (invoice.get('status', 'draft') or 'draft').upper()
     status_color_hex = "#ff0000" if status == "OVERDUE" else "#667eea"
-    inv_info.append(Paragraph(f'Status: <font color="{status_color_hex}"><b>{status}</b></font>', style_right_meta))
+    inv_info.append(Paragraph(f'Status: <font color="{status_color_hex}"><b>{status}</b></font>', _STYLE_RIGHT_META))
 
     header_table = Table([[biz_info, inv_info]], colWidths=[4 * inch, doc.width - 4 * inch])
     header_table.setStyle(TableStyle([
@@ -276,49 +369,50 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
     elements.append(Spacer(1, 0.4 * inch))
 
     # ---------- Client / Project ----------
-    elements.append(Paragraph("BILL TO:", style_label_small))
+    elements.append(Paragraph("BILL TO:", _STYLE_LABEL_SMALL))
     if client.get('name'):
-        elements.append(Paragraph(f"<b>{client['name']}</b>", style_normal))
+        elements.append(Paragraph(f"<b>{client['name']}</b>", _STYLE_NORMAL))
     if client.get('email'):
-        elements.append(Paragraph(client['email'], style_normal))
+        elements.append(Paragraph(client['email'], _STYLE_NORMAL))
     if client.get('address'):
-        elements.append(Paragraph(client['address'], style_normal))
+        elements.append(Paragraph(client['address'], _STYLE_NORMAL))
 
     elements.append(Spacer(1, 0.2 * inch))
 
     if invoice.get('invoiceTitle') or invoice.get('invoiceDescription'):
-        elements.append(Paragraph("Job/Project:", style_label_small))
+        elements.append(Paragraph("Job/Project:", _STYLE_LABEL_SMALL))
         if invoice.get('invoiceTitle'):
-            elements.append(Paragraph(f"<b>{invoice['invoiceTitle']}</b>", style_normal))
+            elements.append(Paragraph(f"<b>{invoice['invoiceTitle']}</b>", _STYLE_NORMAL))
         if invoice.get('invoiceDescription'):
-            elements.append(Paragraph(invoice['invoiceDescription'], style_normal))
+            elements.append(Paragraph(invoice['invoiceDescription'], _STYLE_NORMAL))
         elements.append(Spacer(1, 0.2 * inch))
 
     # ---------- Items table builder ----------
-    def add_items_section(title: str, items: list[Dict[str, Any]], section_total: float):
-        if not items:
+    def add_items_section(
+        title: str,
+        rows: list[tuple[str, float, float, float]],
+        section_total: float,
+        subtotal_widths: tuple[float, float]
+    ):
+        if not rows:
             return
 
-        elements.append(Paragraph(title, style_section))
+        elements.append(Paragraph(title, _STYLE_SECTION))
 
         data = [['Description', 'Quantity', 'Rate', 'Amount']]
-        for it in items:
-            qty = safe_float(it.get('quantity', 0))
-            rate = safe_float(it.get('rate', 0))
-            amt = qty * rate
-
+        for desc, qty, rate, amt in rows:
             data.append([
-                Paragraph(it.get('description', '') or '', style_normal),
+                Paragraph(desc, _STYLE_NORMAL),
                 format_qty(qty),
-                Paragraph(format_currency(rate), style_money),
-                Paragraph(format_currency(amt), style_money),
+                Paragraph(format_currency(rate), _STYLE_MONEY),
+                Paragraph(format_currency(amt), _STYLE_MONEY),
             ])
 
         t = Table(data, colWidths=col_widths_items, repeatRows=1)
 
         t.setStyle(TableStyle([
             # Header
-            ('BACKGROUND', (0, 0), (-1, 0), color_primary),
+            ('BACKGROUND', (0, 0), (-1, 0), _COLOR_PRIMARY),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
             ('FONTSIZE', (0, 0), (-1, 0), 10),
@@ -330,7 +424,7 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
             ('FONTSIZE', (0, 1), (-1, -1), 9),
             ('TOPPADDING', (0, 1), (-1, -1), 10),
             ('BOTTOMPADDING', (0, 1), (-1, -1), 10),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f5f5f5')),
+            ('BACKGROUND', (0, 1), (-1, -1), _COLOR_ROW_BG),
 
             # Align
             ('ALIGN', (0, 0), (0, -1), 'LEFT'),
@@ -339,7 +433,7 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
             ('VALIGN', (0, 0), (-1, -1), 'TOP'),
 
             # Grid
-            ('GRID', (0, 0), (-1, -1), 0.5, color_grid),
+            ('GRID', (0, 0), (-1, -1), 0.5, _COLOR_GRID),
 
             # Inner padding
             ('LEFTPADDING', (0, 0), (-1, -1), 12),
@@ -352,10 +446,29 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
         # ---- SECTION SUBTOTAL (separate 2-col table, right-aligned) ----
         label_text = f"{title.title()} Subtotal:"
         value_text = format_currency(section_total)
+        label_w, value_w = subtotal_widths
+
+        add_pair_table(
+            rows=[(Paragraph(label_text, _STYLE_PAIR_LABEL), Paragraph(value_text, _STYLE_PAIR_VALUE))],
+            label_w=label_w,
+            value_w=value_w,
+            line_above=False
+        )
+
+        elements.append(Spacer(1, 0.25 * inch))
 
-        label_w, value_w = compute_pair_col_widths(
-            max_label_text=label_text,
-            value_strings=[value_text],
+    # ---- Section subtotal widths: measured once for every section that will render ----
+    sections = [
+        (title, rows, total)
+        for (title, rows, total) in (("SERVICES", services, total_services), ("MATERIALS", materials, total_materials))
+        if rows
+    ]
+    subtotal_widths = (0.0, 0.0)
+    if sections:
+        subtotal_labels = [f"{title.title()} Subtotal:" for (title, _, _) in sections]
+        subtotal_widths = compute_pair_col_widths(
+            max_label_text=max(subtotal_labels, key=lambda t: _cached_string_width(t, 'Helvetica-Bold', 10)),
+            value_strings=[format_currency(total) for (_, _, total) in sections],
             font_label='Helvetica-Bold', size_label=10,
             font_value='Helvetica-Bold', size_value=10,
             min_label_w=2.5 * inch,  # Increased to accommodate longer labels
@@ -365,27 +478,18 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
             max_total_w=min(5.0 * inch, doc.width)
         )
 
-        add_pair_table(
-            rows=[(Paragraph(label_text, style_pair_label), Paragraph(value_text, style_pair_value))],
-            label_w=label_w,
-            value_w=value_w,
-            line_above=False
-        )
-
-        elements.append(Spacer(1, 0.25 * inch))
-
-    add_items_section("SERVICES", services, total_services)
-    add_items_section("MATERIALS", materials, total_materials)
+    for (title, rows, total) in sections:
+        add_items_section(title, rows, total, subtotal_widths)
 
     # ---------- Grand totals (separate 2-col table, right-aligned) ----------
     elements.append(Spacer(1, 0.15 * inch))
 
     total_rows = [
-        ("Subtotal:", format_currency(subtotal), style_pair_label, style_pair_value),
+        ("Subtotal:", format_currency(subtotal), _STYLE_PAIR_LABEL, _STYLE_PAIR_VALUE),
     ]
     if tax > 0:
-        total_rows.append(("Tax:", format_currency(tax), style_pair_label, style_pair_value))
-    total_rows.append(("TOTAL:", format_currency(final_total), style_total_label, style_total_value))
+        total_rows.append(("Tax:", format_currency(tax), _STYLE_PAIR_LABEL, _STYLE_PAIR_VALUE))
+    total_rows.append(("TOTAL:", format_currency(final_total), _STYLE_TOTAL_LABEL, _STYLE_TOTAL_VALUE))
 
     # widths based on the widest total currency string, with a compact right-aligned block
     value_strings = [r[1] for r in total_rows]
@@ -420,27 +524,63 @@ def create_pdf_document(invoice_data: Dict[str, Any], user: Dict[str, Any], clie
     elements.append(Paragraph(
         "Thank you for your business!",
         ParagraphStyle(
-            'Footer', parent=style_normal,
+            'Footer', parent=_STYLE_NORMAL,
             alignment=TA_CENTER,
             fontName='Helvetica-Oblique',
-            textColor=color_light
+            textColor=_COLOR_LIGHT
         )
     ))
     elements.append(Paragraph(
         "Generated by BAb the Builder",
         ParagraphStyle(
-            'Footer2', parent=style_normal,
+            'Footer2', parent=_STYLE_NORMAL,
             alignment=TA_CENTER,
             fontSize=9,
-            textColor=color_light
+            textColor=_COLOR_LIGHT
         )
     ))
 
     doc.build(elements)
-    buffer.seek(0)
     return buffer
 
 
+def _pdf_cache_key(invoice_data: Dict[str, Any], user: Dict[str, Any], client: Dict[str, Any]) -> tuple[str, bytes]:
+    """Return (invoice_key, content_digest) for the PDF cache."""
+    payload = json.dumps([invoice_data, user, client], sort_keys=True, default=str)
+    digest = hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+    invoice = invoice_data.get('invoice', invoice_data)
+    invoice_id = invoice.get('_id')
+    return (str(invoice_id) if invoice_id else digest.hex()), digest
+
+
+def invalidate_pdf_cache(invoice_id: Optional[str] = None) -> None:
+    """Drop the cached PDF for one invoice, or every cached PDF if no ID is given."""
+    with _pdf_cache_lock:
+        if invoice_id is None:
+            _pdf_cache.clear()
+        else:
+            _pdf_cache.pop(str(invoice_id), None)
+
+
+def generate_pdf_bytes(invoice_data: Dict[str, Any], user: Dict[str, Any], client: Dict[str, Any]) -> bytes:
+    # Same invoice + user + client content renders the same PDF, so skip ReportLab on repeats
+    invoice_key, digest = _pdf_cache_key(invoice_data, user, client)
+    with _pdf_cache_lock:
+        cached = _pdf_cache.get(invoice_key)
+        if cached is not None and cached[0] == digest:
+            _pdf_cache.move_to_end(invoice_key)
+            return cached[1]
+
+    pdf_bytes = create_pdf_document(invoice_data, user, client, buffer=_thread_buffer()).getvalue()
+
+    with _pdf_cache_lock:
+        _pdf_cache[invoice_key] = (digest, pdf_bytes)
+        _pdf_cache.move_to_end(invoice_key)
+        while len(_pdf_cache) > _PDF_CACHE_MAX:
+            _pdf_cache.popitem(last=False)
+    return pdf_bytes
+
+
 def generate_pdf_base64(invoice_data: Dict[str, Any], user: Dict[str, Any], client: Dict[str, Any]) -> str:
-    pdf_buffer = create_pdf_document(invoice_data, user, client)
-    return base64.b64encode(pdf_buffer.read()).decode('utf-8')
+    """Base64 PDF, only for callers that must embed it in JSON/email; HTTP should serve generate_pdf_bytes()."""
+    return base64.b64encode(generate_pdf_bytes(invoice_data, user, client)).decode('ascii')
@@ -5,6 +5,7 @@ import duckdb
 import pandas as pd
 import requests
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from app.api.dependencies import verify_token
 from app.database import get_database
@@ -135,7 +136,7 @@ async def chat_with_gumloop_orchestrator(req: AgentRequest, token: dict = Depend
                                     issueDate=response.get("issueDate"),
                                     lineItems=response.get("lineItems"),
                                     userId=ObjectId(user_id_db))
-        await create_invoice(invoice=new_invoice)
+        await run_in_threadpool(create_invoice, invoice=new_invoice)
         return {"reply": "Invoice has been created successfully."}
     elif target == "jobs":
         # Extract job fields from Gumloop response
@@ -179,7 +180,7 @@ async def chat_with_gumloop_orchestrator(req: AgentRequest, token: dict = Depend
             endTime=end_time,
         )
         
-        await create_job(job=new_job)
+        await run_in_threadpool(create_job, job=new_job)
         return {"reply": f"Job '{title}' has been created successfully."}
 
     # If it's for the user, just return the message directly
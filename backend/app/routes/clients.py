@@ -5,6 +5,8 @@ from datetime import datetime
 
 from ..models import Client, ClientCreate, ClientUpdate, MessageResponse
 from ..database import get_database
+from .invoices import invalidate_client_cache
+from .object_ids import object_id_ref
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
@@ -29,7 +31,7 @@ def convert_objectid_to_str(doc):
     return doc
 
 @router.post("/", response_model=Client, status_code=status.HTTP_201_CREATED)
-async def create_client(client: ClientCreate):
+def create_client(client: ClientCreate):
     """Create a new client"""
     db = get_database()
     
@@ -40,8 +42,10 @@ async def create_client(client: ClientCreate):
             detail="Invalid user ID format"
         )
     
-    # Verify user exists (MongoDB will handle ObjectId conversion)
-    user = db.users.find_one({"_id": ObjectId(client.userId)})
+    user_oid = ObjectId(client.userId)
+    
+    # Verify user exists
+    user = db.users.find_one({"_id": user_oid})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -50,9 +54,8 @@ async def create_client(client: ClientCreate):
     
     # Insert client
     client_dict = client.model_dump(exclude_unset=True)
-    # Convert userId to ObjectId
-    if client_dict.get("userId"):
-        client_dict["userId"] = ObjectId(client_dict["userId"])
+    # Store userId as ObjectId
+    client_dict["userId"] = user_oid
     result = db.clients.insert_one(client_dict)
     
     # Return created client - convert ObjectId fields to strings for response
@@ -62,7 +65,7 @@ async def create_client(client: ClientCreate):
     return created_client
 
 @router.get("/", response_model=List[Client])
-async def get_clients(user_id: str = None, archived: bool = None, skip: int = 0, limit: int = 100):
+def get_clients(user_id: str = None, archived: bool = None, skip: int = 0, limit: int = 100):
     """Get all clients, optionally filtered by user_id and archived status"""
     db = get_database()
     
@@ -91,13 +94,19 @@ async def get_clients(user_id: str = None, archived: bool = None, skip: int = 0,
                 {"archived": {"$exists": False}}
             ]
     
-    clients = list(db.clients.find(query).skip(skip).limit(limit))
+    # Only fetch the fields of the Client response model, in a single batch
+    # (batch_size rejects negatives, which limit() accepts)
+    cursor = db.clients.find(
+        query,
+        projection={"name": 1, "email": 1, "userId": 1, "address": 1, "archived": 1}
+    ).skip(skip).limit(limit).batch_size(max(limit, 0))
+    clients = list(cursor)
     # Convert ObjectId fields to strings for response
     clients = [convert_objectid_to_str(client) for client in clients]
     return clients
 
 @router.get("/{client_id}", response_model=Client)
-async def get_client(client_id: str):
+def get_client(client_id: str):
     """Get a specific client by ID"""
     db = get_database()
     
@@ -106,8 +115,9 @@ async def get_client(client_id: str):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid client ID format"
         )
+    client_oid = ObjectId(client_id)
     
-    client = db.clients.find_one({"_id": ObjectId(client_id)})
+    client = db.clients.find_one({"_id": client_oid})
     if not client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,7 +129,7 @@ async def get_client(client_id: str):
     return client
 
 @router.put("/{client_id}", response_model=Client)
-async def update_client(client_id: str, client_update: ClientUpdate):
+def update_client(client_id: str, client_update: ClientUpdate):
     """Update a client"""
     db = get_database()
     
@@ -128,6 +138,7 @@ async def update_client(client_id: str, client_update: ClientUpdate):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid client ID format"
         )
+    client_oid = ObjectId(client_id)
     
     update_data = client_update.model_dump(exclude_unset=True)
     
@@ -148,7 +159,7 @@ async def update_client(client_id: str, client_update: ClientUpdate):
             )
     
     result = db.clients.update_one(
-        {"_id": ObjectId(client_id)},
+        {"_id": client_oid},
         {"$set": update_data}
     )
     
@@ -157,14 +168,15 @@ async def update_client(client_id: str, client_update: ClientUpdate):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Client not found"
         )
+    invalidate_client_cache(client_id)
     
-    updated_client = db.clients.find_one({"_id": ObjectId(client_id)})
+    updated_client = db.clients.find_one({"_id": client_oid})
     if updated_client:
         updated_client = convert_objectid_to_str(updated_client)
     return updated_client
 
 @router.delete("/{client_id}", response_model=MessageResponse)
-async def delete_client(client_id: str):
+def delete_client(client_id: str):
     """Delete a client"""
     db = get_database()
     
@@ -173,8 +185,10 @@ async def delete_client(client_id: str):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid client ID format"
         )
+    client_oid = ObjectId(client_id)
     
-    result = db.clients.delete_one({"_id": ObjectId(client_id)})
+    result = db.clients.delete_one({"_id": client_oid})
+    invalidate_client_cache(client_id)
     
     if result.deleted_count == 0:
         raise HTTPException(
@@ -187,7 +201,7 @@ async def delete_client(client_id: str):
 # ===== RELATIONSHIP ENDPOINTS =====
 
 @router.get("/{client_id}/jobs", response_model=List[Dict[str, Any]])
-async def get_client_jobs(client_id: str, status_filter: str = None):
+def get_client_jobs(client_id: str, status_filter: str = None):
     """Get all jobs for a specific client"""
     db = get_database()
     
@@ -196,36 +210,44 @@ async def get_client_jobs(client_id: str, status_filter: str = None):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid client ID format"
         )
+    client_oid = ObjectId(client_id)
+    client_ref = object_id_ref(client_oid)
     
-    # Verify client exists
-    client = db.clients.find_one({"_id": ObjectId(client_id)})
-    if not client:
+    # Verify client exists (only _id comes back)
+    if db.clients.find_one({"_id": client_oid}, {"_id": 1}) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Client not found"
         )
     
     # Build query
-    query = {"clientId": client_id}
+    query = {"clientId": client_ref}
     if status_filter:
         query["status"] = status_filter
     
-    # Get jobs
-    jobs = list(db.jobs.find(query))
-    
-    # Add invoice info if exists
-    for job in jobs:
-        if job.get("invoiceId"):
-            # invoiceId is already ObjectId, use it directly
-            invoice = db.invoices.find_one({"_id": job["invoiceId"]})
-            if invoice:
-                job["invoiceNumber"] = invoice.get("invoiceNumber")
-                job["invoiceStatus"] = invoice.get("status")
-    
-    return jobs
+    # Get jobs with their invoice info joined server-side (one round-trip instead of N+1)
+    jobs = list(db.jobs.aggregate([
+        {"$match": query},
+        {"$addFields": {"_invoiceOid": {
+            "$convert": {"input": "$invoiceId", "to": "objectId", "onError": None, "onNull": None}
+        }}},
+        {"$lookup": {
+            "from": "invoices",
+            "localField": "_invoiceOid",
+            "foreignField": "_id",
+            "as": "_invoice"
+        }},
+        {"$addFields": {
+            "invoiceNumber": {"$first": "$_invoice.invoiceNumber"},
+            "invoiceStatus": {"$first": "$_invoice.status"}
+        }},
+        {"$project": {"_invoice": 0, "_invoiceOid": 0}}
+    ]))
+    # Convert ObjectId fields to strings for response
+    return [convert_objectid_to_str(doc) for doc in jobs]
 
 @router.get("/{client_id}/invoices", response_model=List[Dict[str, Any]])
-async def get_client_invoices(client_id: str, status_filter: str = None):
+def get_client_invoices(client_id: str, status_filter: str = None):
     """Get all invoices for a specific client"""
     db = get_database()
     
@@ -234,34 +256,44 @@ async def get_client_invoices(client_id: str, status_filter: str = None):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid client ID format"
         )
+    client_oid = ObjectId(client_id)
+    client_ref = object_id_ref(client_oid)
     
-    # Verify client exists
-    client = db.clients.find_one({"_id": ObjectId(client_id)})
-    if not client:
+    # Verify client exists (only _id comes back)
+    if db.clients.find_one({"_id": client_oid}, {"_id": 1}) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Client not found"
         )
     
     # Build query
-    query = {"clientId": client_id}
+    query = {"clientId": client_ref}
     if status_filter:
         query["status"] = status_filter
     
-    # Get invoices and add job info
-    invoices = list(db.invoices.find(query))
-    
-    for invoice in invoices:
-        if invoice.get("jobId"):
-            job = db.jobs.find_one({"_id": ObjectId(invoice["jobId"])})
-            if job:
-                invoice["jobTitle"] = job.get("title")
-                invoice["jobLocation"] = job.get("location")
-    
-    return invoices
+    # Get invoices with their job info joined server-side (one round-trip instead of N+1)
+    invoices = list(db.invoices.aggregate([
+        {"$match": query},
+        {"$addFields": {"_jobOid": {
+            "$convert": {"input": "$jobId", "to": "objectId", "onError": None, "onNull": None}
+        }}},
+        {"$lookup": {
+            "from": "jobs",
+            "localField": "_jobOid",
+            "foreignField": "_id",
+            "as": "_job"
+        }},
+        {"$addFields": {
+            "jobTitle": {"$first": "$_job.title"},
+            "jobLocation": {"$first": "$_job.location"}
+        }},
+        {"$project": {"_job": 0, "_jobOid": 0}}
+    ]))
+    # Convert ObjectId fields to strings for response
+    return [convert_objectid_to_str(doc) for doc in invoices]
 
 @router.get("/{client_id}/summary")
-async def get_client_summary(client_id: str):
+def get_client_summary(client_id: str):
     """Get a summary of client's data including job and invoice counts"""
     db = get_database()
     
@@ -270,9 +302,14 @@ async def get_client_summary(client_id: str):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid client ID format"
         )
+    client_oid = ObjectId(client_id)
+    client_ref = object_id_ref(client_oid)
     
-    # Get client
-    client = db.clients.find_one({"_id": ObjectId(client_id)})
+    # Get client (only the fields the summary returns)
+    client = db.clients.find_one(
+        {"_id": client_oid},
+        {"name": 1, "email": 1, "address": 1, "userId": 1}
+    )
     if not client:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -282,27 +319,39 @@ async def get_client_summary(client_id: str):
     # Get user info
     user_info = None
     if client.get("userId"):
-        user = db.users.find_one({"_id": ObjectId(client["userId"])})
+        user_oid = client["userId"] if isinstance(client["userId"], ObjectId) else ObjectId(client["userId"])
+        user = db.users.find_one(
+            {"_id": user_oid},
+            {"businessName": 1, "businessEmail": 1}
+        )
         if user:
             user_info = {
                 "businessName": user.get("businessName"),
                 "businessEmail": user.get("businessEmail")
             }
     
-    # Count related documents
-    job_count = db.jobs.count_documents({"clientId": client_id})
-    invoice_count = db.invoices.count_documents({"clientId": client_id})
-    
-    # Get job status breakdown
-    jobs_pending = db.jobs.count_documents({"clientId": client_id, "status": "pending"})
-    jobs_in_progress = db.jobs.count_documents({"clientId": client_id, "status": "in_progress"})
-    jobs_completed = db.jobs.count_documents({"clientId": client_id, "status": "completed"})
-    
-    # Calculate total billed
-    client_invoices = list(db.invoices.find({"clientId": client_id}))
-    total_billed = sum(inv.get("total", 0) for inv in client_invoices)
-    total_paid = sum(inv.get("total", 0) for inv in client_invoices if inv.get("status") == "paid")
-    total_outstanding = sum(inv.get("total", 0) for inv in client_invoices if inv.get("status") in ["sent", "overdue"])
+    # Job counts per status (one round-trip)
+    job_status_counts = {
+        row["_id"]: row["n"]
+        for row in db.jobs.aggregate([
+            {"$match": {"clientId": client_ref}},
+            {"$group": {"_id": "$status", "n": {"$sum": 1}}}
+        ])
+    }
+    job_count = sum(job_status_counts.values())
+    jobs_pending = job_status_counts.get("pending", 0)
+    jobs_in_progress = job_status_counts.get("in_progress", 0)
+    jobs_completed = job_status_counts.get("completed", 0)
+    
+    # Invoice counts and totals per status, summed server-side
+    invoice_status_totals = list(db.invoices.aggregate([
+        {"$match": {"clientId": client_ref}},
+        {"$group": {"_id": "$status", "n": {"$sum": 1}, "total": {"$sum": "$total"}}}
+    ]))
+    invoice_count = sum(row["n"] for row in invoice_status_totals)
+    total_billed = sum(row["total"] for row in invoice_status_totals)
+    total_paid = sum(row["total"] for row in invoice_status_totals if row["_id"] == "paid")
+    total_outstanding = sum(row["total"] for row in invoice_status_totals if row["_id"] in ["sent", "overdue"])
     
     return {
         "client": {
@@ -1,15 +1,122 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Response, status
+from typing import List, Dict, Any, Optional
+from collections import deque
+import threading
+from cachetools import TTLCache
+import re
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime, timezone
+from urllib.parse import quote
 
 from ..models import Invoice, InvoiceCreate, InvoiceUpdate, MessageResponse
 from ..database import get_database
+from ..config import settings
 from ..email_service import send_invoice_email, send_payment_reminder
-from ..pdf_generator import generate_pdf_base64
+from ..pdf_generator import generate_pdf_base64, generate_pdf_bytes, invalidate_pdf_cache
+from .object_ids import OBJECT_ID_PATTERN, parse_object_id, object_id_expr
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
+# Anything but letters, digits, dot, dash and underscore is replaced in the ASCII download filename
+UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+# Fields the invoice endpoints actually read from related documents
+USER_BUSINESS_PROJECTION = {
+    "businessName": 1, "businessEmail": 1, "businessPhone": 1,
+    "businessAddress": 1, "businessCategory": 1, "hourlyRate": 1
+}
+CLIENT_CONTACT_PROJECTION = {"name": 1, "email": 1, "address": 1}
+JOB_SUMMARY_PROJECTION = {"title": 1, "status": 1, "startTime": 1, "endTime": 1, "location": 1}
+
+# Related documents get_invoices can embed: include name -> (collection, invoice field, projection)
+INVOICE_LIST_INCLUDES = {
+    "client": ("clients", "$clientId", CLIENT_CONTACT_PROJECTION),
+    "user": ("users", "$userId", USER_BUSINESS_PROJECTION),
+}
+
+# Sender/recipient details for invoice emails, cached briefly (keyed by ID string): they rarely
+# change, and the overdue check would otherwise re-read the same user and clients per invoice
+_user_cache = TTLCache(maxsize=10_000, ttl=30)
+_client_cache = TTLCache(maxsize=10_000, ttl=30)
+_relations_cache_lock = threading.Lock()
+
+def _find_cached(cache, collection, doc_id, projection):
+    key = str(doc_id)
+    with _relations_cache_lock:
+        doc = cache.get(key)
+    if doc is None:
+        doc = collection.find_one({"_id": ObjectId(doc_id)}, projection)
+        if doc is not None:
+            with _relations_cache_lock:
+                cache[key] = doc
+    return doc
+
+def get_user_business(db, user_id):
+    """User's business details (USER_BUSINESS_PROJECTION), cached for up to 30 seconds"""
+    return _find_cached(_user_cache, db.users, user_id, USER_BUSINESS_PROJECTION)
+
+def get_client_contact(db, client_id):
+    """Client's contact details (CLIENT_CONTACT_PROJECTION), cached for up to 30 seconds"""
+    return _find_cached(_client_cache, db.clients, client_id, CLIENT_CONTACT_PROJECTION)
+
+def invalidate_user_cache(user_id=None):
+    """Drop one user's cached details, or every user's if no ID is given"""
+    with _relations_cache_lock:
+        if user_id is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(str(user_id), None)
+
+def invalidate_client_cache(client_id):
+    """Drop one client's cached details"""
+    with _relations_cache_lock:
+        _client_cache.pop(str(client_id), None)
+
+# Invoice numbers reserved from each user's counter but not handed out yet: userId -> deque of ints.
+# Off by default (block size 1). With larger blocks most creates skip the counter round-trip,
+# at the cost that numbers are only sequential within a process and unused ones are skipped
+# after a restart.
+_invoice_number_blocks: Dict[str, deque] = {}
+_invoice_number_locks: Dict[str, threading.Lock] = {}
+_invoice_number_locks_guard = threading.Lock()
+
+def _invoice_number_lock(key: str) -> threading.Lock:
+    with _invoice_number_locks_guard:
+        return _invoice_number_locks.setdefault(key, threading.Lock())
+
+def next_invoice_number(db, user_oid: ObjectId) -> Optional[int]:
+    """Next auto-generated invoice number for a user, or None if the user does not exist"""
+    key = str(user_oid)
+    with _invoice_number_lock(key):
+        block = _invoice_number_blocks.get(key)
+        if block:
+            return block.popleft()
+        
+        # Atomically bump the user's last invoice number (starting from 1000) by a whole block
+        # and read it back, so concurrent creates (in any process) never get the same number
+        block_size = max(1, settings.INVOICE_NUMBER_BLOCK_SIZE)
+        user = db.users.find_one_and_update(
+            {"_id": user_oid},
+            [{"$set": {"lastInvoiceNumber": {"$add": [{"$ifNull": ["$lastInvoiceNumber", 1000]}, block_size]}}}],
+            projection={"lastInvoiceNumber": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not user:
+            return None
+        last = user["lastInvoiceNumber"]
+        _invoice_number_blocks[key] = deque(range(last - block_size + 2, last + 1))
+        return last - block_size + 1
+
+def release_invoice_numbers(user_id):
+    """
+    Drop a user's reserved invoice numbers (after their counter is changed or the user is deleted).
+    Only affects this process: with blocks enabled, other workers keep their blocks until restarted.
+    """
+    key = str(user_id)
+    with _invoice_number_lock(key):
+        _invoice_number_blocks.pop(key, None)
+
 def check_and_update_overdue_invoices(user_id: str = None):
     """Check for sent invoices with past due dates and update them to overdue"""
     db = get_database()
@@ -18,11 +125,14 @@ def check_and_update_overdue_invoices(user_id: str = None):
     query = {"status": "sent"}
     if user_id:
         # Convert user_id string to ObjectId for query
-        if ObjectId.is_valid(user_id):
+        if OBJECT_ID_PATTERN.fullmatch(user_id):
             query["userId"] = ObjectId(user_id)
     
-    # Get all sent invoices
-    sent_invoices = list(db.invoices.find(query))
+    # Get all sent invoices (only the fields the overdue check and reminder use)
+    sent_invoices = list(db.invoices.find(
+        query,
+        {"status": 1, "dueDate": 1, "userId": 1, "clientId": 1, "invoiceNumber": 1, "total": 1}
+    ))
     
     # Get current date (UTC)
     today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -67,12 +177,12 @@ def check_and_update_overdue_invoices(user_id: str = None):
                             # Get user (sender) details
                             user = None
                             if invoice.get("userId"):
-                                user = db.users.find_one({"_id": ObjectId(invoice["userId"])})
+                                user = get_user_business(db, invoice["userId"])
                             
                             # Get client (recipient) details
                             client = None
                             if invoice.get("clientId"):
-                                client = db.clients.find_one({"_id": ObjectId(invoice["clientId"])})
+                                client = get_client_contact(db, invoice["clientId"])
                             
                             if user and client and client.get("email"):
                                 # Prepare invoice data for reminder
@@ -131,102 +241,119 @@ def convert_objectid_to_str(doc):
         return result
     return doc
 
+def find_invoice_with_relations(db, invoice_oid: ObjectId):
+    """
+    Fetch an invoice with its user, client and job joined in, in a single aggregation.
+    The related documents come back embedded as `_user`, `_client` and `_job`
+    (missing if the reference is empty or points nowhere). Returns None if there is no such invoice.
+    """
+    pipeline = [
+        {"$match": {"_id": invoice_oid}},
+        {"$addFields": {
+            "_userOid": object_id_expr("$userId"),
+            "_clientOid": object_id_expr("$clientId"),
+            "_jobOid": object_id_expr("$jobId")
+        }},
+        {"$lookup": {
+            "from": "users",
+            "localField": "_userOid",
+            "foreignField": "_id",
+            "as": "_user",
+            "pipeline": [{"$project": USER_BUSINESS_PROJECTION}]
+        }},
+        {"$lookup": {
+            "from": "clients",
+            "localField": "_clientOid",
+            "foreignField": "_id",
+            "as": "_client",
+            "pipeline": [{"$project": CLIENT_CONTACT_PROJECTION}]
+        }},
+        {"$lookup": {
+            "from": "jobs",
+            "localField": "_jobOid",
+            "foreignField": "_id",
+            "as": "_job",
+            "pipeline": [{"$project": JOB_SUMMARY_PROJECTION}]
+        }},
+        {"$unwind": {"path": "$_user", "preserveNullAndEmptyArrays": True}},
+        {"$unwind": {"path": "$_client", "preserveNullAndEmptyArrays": True}},
+        {"$unwind": {"path": "$_job", "preserveNullAndEmptyArrays": True}},
+        {"$project": {"_userOid": 0, "_clientOid": 0, "_jobOid": 0}}
+    ]
+    return next(db.invoices.aggregate(pipeline), None)
+
 @router.post("/", response_model=Invoice, status_code=status.HTTP_201_CREATED)
-async def create_invoice(invoice: InvoiceCreate):
+def create_invoice(invoice: InvoiceCreate):
     """Create a new invoice"""
     db = get_database()
     
     # Validate user ID format
-    if not ObjectId.is_valid(invoice.userId):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid user ID format"
-        )
-    
-    # Validate user exists (MongoDB will handle ObjectId conversion)
-    user = db.users.find_one({"_id": ObjectId(invoice.userId)})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
+    invoice_user_id_obj = parse_object_id(invoice.userId, "user")
     
-    # Validate and get client ID
+    # Validate and get client ID (read-only here, so a bad client doesn't use up an invoice number)
+    client = None
     client_id_obj = None
     if invoice.clientId and invoice.clientId.strip():
-        if not ObjectId.is_valid(invoice.clientId):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid client ID format"
-            )
+        client_id_obj = parse_object_id(invoice.clientId, "client")
         
-        # Verify client exists and auto-link to user if not already linked
-        client = db.clients.find_one({"_id": ObjectId(invoice.clientId)})
+        # Verify client exists
+        client = db.clients.find_one({"_id": client_id_obj}, {"userId": 1, "address": 1})
         if not client:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Client not found"
             )
-        
-        client_id_obj = ObjectId(invoice.clientId)
-        
-        # Ensure client is linked to the invoice creator's userId
-        # If client has a different userId, update it to match the invoice creator
+    
+    # Validate user exists before writing anything; when auto-numbering,
+    # taking the next invoice number doubles as this check
+    if invoice.invoiceNumber:
+        user_exists = db.users.find_one({"_id": invoice_user_id_obj}, {"_id": 1}) is not None
+    else:
+        invoice_number = next_invoice_number(db, invoice_user_id_obj)
+        user_exists = invoice_number is not None
+        if user_exists:
+            invoice.invoiceNumber = f"INV-{invoice_number}"
+    if not user_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    # Ensure client is linked to the invoice creator's userId
+    # If client has a different userId, update it to match the invoice creator
+    if client:
         client_user_id = client.get("userId")
-        invoice_user_id_obj = ObjectId(invoice.userId)
         
         if not client_user_id or ObjectId(client_user_id) != invoice_user_id_obj:
             db.clients.update_one(
-                {"_id": ObjectId(invoice.clientId)},
+                {"_id": client_id_obj},
                 {"$set": {"userId": invoice_user_id_obj}}
             )
     
-    # Auto-generate invoice number if not provided
-    if not invoice.invoiceNumber:
-        # Get user's last invoice number
-        last_number = user.get("lastInvoiceNumber", 1000)
-        invoice.invoiceNumber = f"INV-{last_number + 1}"
-        
-        # Update user's last invoice number
-        db.users.update_one(
-            {"_id": ObjectId(invoice.userId)},
-            {"$set": {"lastInvoiceNumber": last_number + 1}}
-        )
-    
-    # Insert invoice
+    # Build invoice document
     invoice_dict = invoice.model_dump(exclude_unset=True)
     # Convert userId to ObjectId
     if invoice_dict.get("userId"):
-        invoice_dict["userId"] = ObjectId(invoice_dict["userId"])
+        invoice_dict["userId"] = invoice_user_id_obj
     # Set clientId if we found one
     if client_id_obj:
         invoice_dict["clientId"] = client_id_obj
     # Convert jobId to ObjectId if provided and not empty
     if invoice_dict.get("jobId") and invoice_dict["jobId"].strip():
         invoice_dict["jobId"] = ObjectId(invoice_dict["jobId"])
-    result = db.invoices.insert_one(invoice_dict)
-    invoice_id_obj = result.inserted_id
     
-    # Create job after invoice is created (only if we have a clientId AND no jobId was provided)
-    # If a jobId was already provided, use that job instead of creating a new one
+    # Create a job along with the invoice (only if we have a clientId AND no jobId was provided)
+    # If a jobId was already provided, use that job instead of creating a new one.
+    # Both ids are allocated up front so the invoice is inserted already linked to its job.
+    job_data = None
     if client_id_obj and not invoice_dict.get("jobId"):
-        # Use the invoice creator's userId (not the client's userId)
-        invoice_creator_user_id = ObjectId(invoice.userId)
-        
-        # Re-fetch client to get the client's address for job location
-        # The job location should be where the work was performed (client's address)
-        client_for_job = db.clients.find_one({"_id": client_id_obj})
-        if not client_for_job:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Client not found when creating job"
-            )
+        invoice_dict["_id"] = ObjectId()
         
         # Get client's address for job location (where the work was performed)
-        job_location = client_for_job.get("address") or ""
+        job_location = client.get("address") or ""
         
         # Debug: Print to verify we're using the correct address
-        print(f"DEBUG: Creating job for invoice. Invoice userId: {invoice_creator_user_id}, Client ID: {client_id_obj}, Client Address: {job_location}")
+        print(f"DEBUG: Creating job for invoice. Invoice userId: {invoice_user_id_obj}, Client ID: {client_id_obj}, Client Address: {job_location}")
         
         # Use invoice dates for job start/end times, or current time if not available
         start_time = invoice.issueDate if invoice.issueDate else datetime.utcnow()
@@ -234,43 +361,50 @@ async def create_invoice(invoice: InvoiceCreate):
         
         # Create job data
         job_data = {
-            "userId": ObjectId(invoice.userId),
+            "_id": ObjectId(),
+            "userId": invoice_user_id_obj,  # The invoice creator (not the client's userId)
             "clientId": client_id_obj,
-            "invoiceId": ObjectId(invoice_id_obj),  # Store as ObjectId
+            "invoiceId": invoice_dict["_id"],  # Store as ObjectId
             "title": invoice.invoiceTitle or invoice.invoiceDescription or "Invoice Job",
             "status": "completed",  # User said "done" but model uses "completed"
             "location": job_location,  # Use client's address, not user's business address
             "startTime": start_time,
             "endTime": end_time
         }
-        
-        # Insert job
-        job_result = db.jobs.insert_one(job_data)
-        job_id_obj = job_result.inserted_id
-        
-        # Update invoice with jobId (store as ObjectId)
-        db.invoices.update_one(
-            {"_id": invoice_id_obj},
-            {"$set": {"jobId": ObjectId(job_id_obj)}}
-        )
+        invoice_dict["jobId"] = job_data["_id"]
+    
+    # Insert invoice, then its job
+    db.invoices.insert_one(invoice_dict)
+    if job_data:
+        db.jobs.insert_one(job_data)
     
-    # Return created invoice - convert ObjectId fields to strings for response
-    created_invoice = db.invoices.find_one({"_id": invoice_id_obj})
-    if created_invoice:
-        created_invoice = convert_objectid_to_str(created_invoice)
-    return created_invoice
+    # Return created invoice (insert_one filled in _id) - convert ObjectId fields to strings for response
+    return convert_objectid_to_str(invoice_dict)
 
 @router.get("/", response_model=List[Invoice])
-async def get_invoices(
+def get_invoices(
     user_id: str = None,
     client_id: str = None,
     status_filter: str = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    include: str = None
 ):
-    """Get all invoices with optional filters"""
+    """
+    Get all invoices with optional filters.
+    `include` is a comma-separated list of related documents to embed in each invoice
+    (`client`, `user`), fetched in the same query instead of one lookup per invoice.
+    """
     db = get_database()
     
+    expand = {part.strip() for part in include.split(",") if part.strip()} if include else set()
+    unknown = expand - INVOICE_LIST_INCLUDES.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid include value(s): {', '.join(sorted(unknown))}"
+        )
+    
     # Check and update overdue invoices before fetching
     # Only check if we're not specifically filtering for overdue (to avoid infinite loops)
     if status_filter != "overdue":
@@ -279,42 +413,50 @@ async def get_invoices(
     query = {}
     if user_id:
         # Convert user_id string to ObjectId for query
-        if ObjectId.is_valid(user_id):
-            query["userId"] = ObjectId(user_id)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid user ID format"
-            )
+        query["userId"] = parse_object_id(user_id, "user")
     if client_id:
         # Convert client_id string to ObjectId for query
-        if ObjectId.is_valid(client_id):
-            query["clientId"] = ObjectId(client_id)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid client ID format"
-            )
+        query["clientId"] = parse_object_id(client_id, "client")
     if status_filter:
         query["status"] = status_filter
     
-    invoices = list(db.invoices.find(query).skip(skip).limit(limit))
+    if expand:
+        # Page first so the joins only run for the invoices being returned
+        # (limit matches find(): 0 means no limit, a negative one returns that many)
+        pipeline = [{"$match": query}]
+        if skip:
+            pipeline.append({"$skip": skip})
+        if limit:
+            pipeline.append({"$limit": abs(limit)})
+        for name in sorted(expand):
+            collection, local_field, projection = INVOICE_LIST_INCLUDES[name]
+            pipeline += [
+                {"$addFields": {f"_{name}Oid": object_id_expr(local_field)}},
+                {"$lookup": {
+                    "from": collection,
+                    "localField": f"_{name}Oid",
+                    "foreignField": "_id",
+                    "as": name,
+                    "pipeline": [{"$project": projection}]
+                }},
+                {"$unwind": {"path": f"${name}", "preserveNullAndEmptyArrays": True}},
+                {"$project": {f"_{name}Oid": 0}}
+            ]
+        invoices = list(db.invoices.aggregate(pipeline))
+    else:
+        invoices = list(db.invoices.find(query).skip(skip).limit(limit))
     # Convert ObjectId fields to strings for response
     invoices = [convert_objectid_to_str(inv) for inv in invoices]
     return invoices
 
 @router.get("/{invoice_id}", response_model=Invoice)
-async def get_invoice(invoice_id: str):
+def get_invoice(invoice_id: str):
     """Get a specific invoice by ID"""
     db = get_database()
     
-    if not ObjectId.is_valid(invoice_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid invoice ID format"
-        )
+    invoice_oid = parse_object_id(invoice_id, "invoice")
     
-    invoice = db.invoices.find_one({"_id": ObjectId(invoice_id)})
+    invoice = db.invoices.find_one({"_id": invoice_oid})
     if not invoice:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -326,15 +468,11 @@ async def get_invoice(invoice_id: str):
     return invoice
 
 @router.put("/{invoice_id}", response_model=Invoice)
-async def update_invoice(invoice_id: str, invoice_update: InvoiceUpdate):
+def update_invoice(invoice_id: str, invoice_update: InvoiceUpdate):
     """Update an invoice"""
     db = get_database()
     
-    if not ObjectId.is_valid(invoice_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid invoice ID format"
-        )
+    invoice_oid = parse_object_id(invoice_id, "invoice")
     
     update_data = invoice_update.model_dump(exclude_unset=True)
     
@@ -346,55 +484,41 @@ async def update_invoice(invoice_id: str, invoice_update: InvoiceUpdate):
     
     # Convert userId, clientId, jobId to ObjectId if present in update data
     if update_data.get("userId"):
-        if ObjectId.is_valid(update_data["userId"]):
-            update_data["userId"] = ObjectId(update_data["userId"])
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid user ID format"
-            )
+        update_data["userId"] = parse_object_id(update_data["userId"], "user")
     if update_data.get("clientId") and update_data["clientId"].strip():
-        if ObjectId.is_valid(update_data["clientId"]):
-            update_data["clientId"] = ObjectId(update_data["clientId"])
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid client ID format"
-            )
+        update_data["clientId"] = parse_object_id(update_data["clientId"], "client")
     if update_data.get("jobId") and update_data["jobId"].strip():
-        if ObjectId.is_valid(update_data["jobId"]):
-            update_data["jobId"] = ObjectId(update_data["jobId"])
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid job ID format"
-            )
-    
-    # Get invoice before update to check if status is changing to 'sent'
-    invoice_before = db.invoices.find_one({"_id": ObjectId(invoice_id)})
-    if not invoice_before:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Invoice not found"
-        )
+        update_data["jobId"] = parse_object_id(update_data["jobId"], "job")
     
-    was_draft = invoice_before.get("status") == "draft"
+    # If the status is changing to 'sent', check whether it was a draft (to send the email below)
     is_being_sent = update_data.get("status") == "sent"
+    was_draft = False
+    if is_being_sent:
+        invoice_before = db.invoices.find_one({"_id": invoice_oid}, {"status": 1})
+        if not invoice_before:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Invoice not found"
+            )
+        was_draft = invoice_before.get("status") == "draft"
     
-    result = db.invoices.update_one(
-        {"_id": ObjectId(invoice_id)},
-        {"$set": update_data}
+    # Update and get the updated invoice back in one round-trip
+    updated_invoice = db.invoices.find_one_and_update(
+        {"_id": invoice_oid},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_invoice is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invoice not found"
         )
     
-    updated_invoice = db.invoices.find_one({"_id": ObjectId(invoice_id)})
-    if updated_invoice:
-        updated_invoice = convert_objectid_to_str(updated_invoice)
+    # The cached PDF for this invoice is stale now
+    invalidate_pdf_cache(invoice_id)
+    
+    updated_invoice = convert_objectid_to_str(updated_invoice)
     
     # Send email if status changed from draft to sent
     if was_draft and is_being_sent:
@@ -402,12 +526,12 @@ async def update_invoice(invoice_id: str, invoice_update: InvoiceUpdate):
             # Get user (sender) details
             user = None
             if updated_invoice.get("userId"):
-                user = db.users.find_one({"_id": ObjectId(updated_invoice["userId"])})
+                user = get_user_business(db, updated_invoice["userId"])
             
             # Get client (recipient) details
             client = None
             if updated_invoice.get("clientId"):
-                client = db.clients.find_one({"_id": ObjectId(updated_invoice["clientId"])})
+                client = get_client_contact(db, updated_invoice["clientId"])
             
             if user and client and client.get("email"):
                 # Prepare invoice data for email
@@ -463,17 +587,13 @@ async def update_invoice(invoice_id: str, invoice_update: InvoiceUpdate):
     return updated_invoice
 
 @router.delete("/{invoice_id}", response_model=MessageResponse)
-async def delete_invoice(invoice_id: str):
+def delete_invoice(invoice_id: str):
     """Delete an invoice"""
     db = get_database()
     
-    if not ObjectId.is_valid(invoice_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid invoice ID format"
-        )
+    invoice_oid = parse_object_id(invoice_id, "invoice")
     
-    result = db.invoices.delete_one({"_id": ObjectId(invoice_id)})
+    result = db.invoices.delete_one({"_id": invoice_oid})
     
     if result.deleted_count == 0:
         raise HTTPException(
@@ -481,75 +601,67 @@ async def delete_invoice(invoice_id: str):
             detail="Invoice not found"
         )
     
+    invalidate_pdf_cache(invoice_id)
+    
     return {"message": f"Invoice {invoice_id} deleted successfully"}
 
 # ===== RELATIONSHIP ENDPOINTS =====
 
 @router.get("/{invoice_id}/details")
-async def get_invoice_details(invoice_id: str):
+def get_invoice_details(invoice_id: str):
     """Get invoice with complete context: user, client, and job information"""
     db = get_database()
     
-    if not ObjectId.is_valid(invoice_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid invoice ID format"
-        )
+    invoice_oid = parse_object_id(invoice_id, "invoice")
     
-    # Get invoice
-    invoice = db.invoices.find_one({"_id": ObjectId(invoice_id)})
+    # Get invoice with user, client and job in one round-trip
+    invoice = find_invoice_with_relations(db, invoice_oid)
     if not invoice:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invoice not found"
         )
+    user = invoice.pop("_user", None)
+    client = invoice.pop("_client", None)
+    job = invoice.pop("_job", None)
     
     # Convert ObjectId and datetime fields to strings for JSON serialization
     invoice = convert_objectid_to_str(invoice)
     
-    # Get user details
+    # User details
     user_details = None
-    if invoice.get("userId"):
-        # MongoDB will handle ObjectId conversion
-        user = db.users.find_one({"_id": ObjectId(invoice["userId"])})
-        if user:
-            user_details = {
-                "_id": str(user["_id"]),
-                "businessName": user.get("businessName"),
-                "businessEmail": user.get("businessEmail"),
-                "businessPhone": user.get("businessPhone"),
-                "businessAddress": user.get("businessAddress"),
-                "businessCategory": user.get("businessCategory"),
-                "hourlyRate": user.get("hourlyRate")
-            }
-    
-    # Get client details
+    if user:
+        user_details = {
+            "_id": str(user["_id"]),
+            "businessName": user.get("businessName"),
+            "businessEmail": user.get("businessEmail"),
+            "businessPhone": user.get("businessPhone"),
+            "businessAddress": user.get("businessAddress"),
+            "businessCategory": user.get("businessCategory"),
+            "hourlyRate": user.get("hourlyRate")
+        }
+    
+    # Client details
     client_details = None
-    if invoice.get("clientId") and invoice.get("clientId").strip():
-        if ObjectId.is_valid(invoice["clientId"]):
-            client = db.clients.find_one({"_id": ObjectId(invoice["clientId"])})
-            if client:
-                client_details = {
-                    "_id": str(client["_id"]),
-                    "name": client.get("name"),
-                    "email": client.get("email"),
-                    "address": client.get("address")
-                }
+    if client:
+        client_details = {
+            "_id": str(client["_id"]),
+            "name": client.get("name"),
+            "email": client.get("email"),
+            "address": client.get("address")
+        }
     
-    # Get job details if exists
+    # Job details if exists
     job_details = None
-    if invoice.get("jobId") and invoice.get("jobId").strip():
-        if ObjectId.is_valid(invoice["jobId"]):
-            job = db.jobs.find_one({"_id": ObjectId(invoice["jobId"])})
-            if job:
-                job_details = {
-                    "_id": str(job["_id"]),
-                    "title": job.get("title"),
-                    "status": job.get("status"),
-                    "startTime": job.get("startTime"),
-                    "endTime": job.get("endTime"),
-                    "location": job.get("location")
-                }
+    if job:
+        job_details = {
+            "_id": str(job["_id"]),
+            "title": job.get("title"),
+            "status": job.get("status"),
+            "startTime": job.get("startTime"),
+            "endTime": job.get("endTime"),
+            "location": job.get("location")
+        }
     
     return {
         "invoice": invoice,
@@ -559,38 +671,22 @@ async def get_invoice_details(invoice_id: str):
     }
 
 @router.get("/{invoice_id}/printable")
-async def get_printable_invoice(invoice_id: str):
+def get_printable_invoice(invoice_id: str):
     """Get a fully formatted invoice ready for printing or PDF generation"""
     db = get_database()
     
-    if not ObjectId.is_valid(invoice_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid invoice ID format"
-        )
+    invoice_oid = parse_object_id(invoice_id, "invoice")
     
-    # Get invoice
-    invoice = db.invoices.find_one({"_id": ObjectId(invoice_id)})
+    # Get invoice with sender, recipient and job in one round-trip
+    invoice = find_invoice_with_relations(db, invoice_oid)
     if not invoice:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invoice not found"
         )
-    
-    # Get user (sender) details
-    user = None
-    if invoice.get("userId"):
-        user = db.users.find_one({"_id": ObjectId(invoice["userId"])})
-    
-    # Get client (recipient) details
-    client = None
-    if invoice.get("clientId"):
-        client = db.clients.find_one({"_id": ObjectId(invoice["clientId"])})
-    
-    # Get job details if exists
-    job = None
-    if invoice.get("jobId"):
-        job = db.jobs.find_one({"_id": ObjectId(invoice["jobId"])})
+    user = invoice.get("_user")
+    client = invoice.get("_client")
+    job = invoice.get("_job")
     
     # Format for printing
     return {
@@ -619,35 +715,64 @@ async def get_printable_invoice(invoice_id: str):
         "total": invoice.get("total", 0)
     }
 
+def pdf_content_disposition(filename: str) -> str:
+    """
+    Content-Disposition header for an inline download. The invoice number is free-form, so the plain
+    filename gets a safe ASCII version and the exact name goes in the RFC 6266 filename* parameter.
+    """
+    ascii_name = UNSAFE_FILENAME_CHARS.sub("_", filename)
+    return f"inline; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename, safe='')}"
 
-@router.post("/{invoice_id}/send-reminder", response_model=MessageResponse)
-async def send_invoice_reminder(invoice_id: str):
-    """Send a payment reminder email for an overdue invoice"""
+@router.get("/{invoice_id}/pdf")
+def get_invoice_pdf(invoice_id: str):
+    """Download the invoice as a PDF (raw application/pdf, no base64 wrapping)"""
     db = get_database()
     
-    if not ObjectId.is_valid(invoice_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid invoice ID format"
-        )
+    invoice_oid = parse_object_id(invoice_id, "invoice")
     
-    # Get invoice
-    invoice = db.invoices.find_one({"_id": ObjectId(invoice_id)})
+    # Get invoice with sender and recipient in one round-trip
+    invoice = find_invoice_with_relations(db, invoice_oid)
     if not invoice:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invoice not found"
         )
+    user = invoice.pop("_user", None) or {}
+    client = invoice.pop("_client", None) or {}
+    invoice.pop("_job", None)
+    invoice = convert_objectid_to_str(invoice)
     
-    # Get user (sender) details
-    user = None
-    if invoice.get("userId"):
-        user = db.users.find_one({"_id": ObjectId(invoice["userId"])})
+    pdf_data = {
+        "invoice": invoice,
+        "user": user,
+        "client": client
+    }
+    pdf_bytes = generate_pdf_bytes(pdf_data, user, client)
     
-    # Get client (recipient) details
-    client = None
-    if invoice.get("clientId"):
-        client = db.clients.find_one({"_id": ObjectId(invoice["clientId"])})
+    filename = f"{invoice.get('invoiceNumber') or invoice_id}.pdf"
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": pdf_content_disposition(filename)}
+    )
+
+
+@router.post("/{invoice_id}/send-reminder", response_model=MessageResponse)
+def send_invoice_reminder(invoice_id: str):
+    """Send a payment reminder email for an overdue invoice"""
+    db = get_database()
+    
+    invoice_oid = parse_object_id(invoice_id, "invoice")
+    
+    # Get invoice with sender and recipient in one round-trip
+    invoice = find_invoice_with_relations(db, invoice_oid)
+    if not invoice:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invoice not found"
+        )
+    user = invoice.get("_user")
+    client = invoice.get("_client")
     
     if not user:
         raise HTTPException(
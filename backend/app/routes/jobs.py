@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, status
 from typing import List, Dict, Any
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 
 from ..models import Job, JobCreate, JobUpdate, MessageResponse
 from ..database import get_database
+from .object_ids import OBJECT_ID_PATTERN, parse_object_id, object_id_expr
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
@@ -28,20 +30,59 @@ def convert_objectid_to_str(doc):
         return result
     return doc
 
+def find_job_with_relations(db, job_oid: ObjectId):
+    """
+    Fetch a job with its client, user and invoice joined in, in a single aggregation.
+    The related documents come back embedded as `_client`, `_user` and `_invoice`
+    (missing if the reference is empty or points nowhere). Returns None if there is no such job.
+    """
+    pipeline = [
+        {"$match": {"_id": job_oid}},
+        {"$addFields": {
+            "_clientOid": object_id_expr("$clientId"),
+            "_userOid": object_id_expr("$userId"),
+            "_invoiceOid": object_id_expr("$invoiceId")
+        }},
+        {"$lookup": {
+            "from": "clients",
+            "localField": "_clientOid",
+            "foreignField": "_id",
+            "as": "_client",
+            "pipeline": [{"$project": {"name": 1, "email": 1, "address": 1}}]
+        }},
+        {"$lookup": {
+            "from": "users",
+            "localField": "_userOid",
+            "foreignField": "_id",
+            "as": "_user",
+            "pipeline": [{"$project": {"businessName": 1, "businessEmail": 1, "hourlyRate": 1}}]
+        }},
+        {"$lookup": {
+            "from": "invoices",
+            "localField": "_invoiceOid",
+            "foreignField": "_id",
+            "as": "_invoice",
+            "pipeline": [{"$project": {
+                "invoiceNumber": 1, "status": 1, "total": 1, "issueDate": 1, "dueDate": 1
+            }}]
+        }},
+        {"$unwind": {"path": "$_client", "preserveNullAndEmptyArrays": True}},
+        {"$unwind": {"path": "$_user", "preserveNullAndEmptyArrays": True}},
+        {"$unwind": {"path": "$_invoice", "preserveNullAndEmptyArrays": True}},
+        {"$project": {"_clientOid": 0, "_userOid": 0, "_invoiceOid": 0}}
+    ]
+    return next(db.jobs.aggregate(pipeline), None)
+
 @router.post("/", response_model=Job, status_code=status.HTTP_201_CREATED)
-async def create_job(job: JobCreate):
+def create_job(job: JobCreate):
     """Create a new job"""
     db = get_database()
     
     # Validate user ID format
-    if not ObjectId.is_valid(job.userId):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid user ID format"
-        )
+    user_oid = parse_object_id(job.userId, "user")
     
-    # Verify user exists (MongoDB will handle ObjectId conversion)
-    user = db.users.find_one({"_id": ObjectId(job.userId)})
+    # Verify user exists
+    user = db.users.find_one({"_id": user_oid})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -49,7 +90,7 @@ async def create_job(job: JobCreate):
         )
     
     # Validate client ID only if provided (and only if it looks like an ObjectId)
-    if job.clientId and ObjectId.is_valid(job.clientId):
+    if job.clientId and OBJECT_ID_PATTERN.fullmatch(job.clientId):
         # Verify client exists
         client = db.clients.find_one({"_id": ObjectId(job.clientId)})
         if not client:
@@ -62,24 +103,21 @@ async def create_job(job: JobCreate):
     job_dict = job.model_dump(exclude_unset=True)
     # Convert userId to ObjectId
     if job_dict.get("userId"):
-        job_dict["userId"] = ObjectId(job_dict["userId"])
+        job_dict["userId"] = user_oid
     # Convert clientId to ObjectId if provided and not empty
     if job_dict.get("clientId") and job_dict["clientId"].strip():
         job_dict["clientId"] = ObjectId(job_dict["clientId"])
     # Convert invoiceId to ObjectId if provided and not empty
     if job_dict.get("invoiceId") and job_dict["invoiceId"].strip():
-        if ObjectId.is_valid(job_dict["invoiceId"]):
+        if OBJECT_ID_PATTERN.fullmatch(job_dict["invoiceId"]):
             job_dict["invoiceId"] = ObjectId(job_dict["invoiceId"])
-    result = db.jobs.insert_one(job_dict)
+    db.jobs.insert_one(job_dict)
     
-    # Return created job - convert ObjectId fields to strings for response
-    created_job = db.jobs.find_one({"_id": result.inserted_id})
-    if created_job:
-        created_job = convert_objectid_to_str(created_job)
-    return created_job
+    # Return created job (insert_one filled in _id) - convert ObjectId fields to strings for response
+    return convert_objectid_to_str(job_dict)
 
 @router.get("/", response_model=List[Job])
-async def get_jobs(
+def get_jobs(
     user_id: str = None,
     client_id: str = None,
     status_filter: str = None,
@@ -92,22 +130,10 @@ async def get_jobs(
     query = {}
     if user_id:
         # Convert user_id string to ObjectId for query
-        if ObjectId.is_valid(user_id):
-            query["userId"] = ObjectId(user_id)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid user ID format"
-            )
+        query["userId"] = parse_object_id(user_id, "user")
     if client_id:
         # Convert client_id string to ObjectId for query
-        if ObjectId.is_valid(client_id):
-            query["clientId"] = ObjectId(client_id)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid client ID format"
-            )
+        query["clientId"] = parse_object_id(client_id, "client")
     if status_filter:
         query["status"] = status_filter
     
@@ -117,17 +143,13 @@ async def get_jobs(
     return jobs
 
 @router.get("/{job_id}", response_model=Job)
-async def get_job(job_id: str):
+def get_job(job_id: str):
     """Get a specific job by ID"""
     db = get_database()
     
-    if not ObjectId.is_valid(job_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid job ID format"
-        )
+    job_oid = parse_object_id(job_id, "job")
     
-    job = db.jobs.find_one({"_id": ObjectId(job_id)})
+    job = db.jobs.find_one({"_id": job_oid})
     if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -139,15 +161,11 @@ async def get_job(job_id: str):
     return job
 
 @router.put("/{job_id}", response_model=Job)
-async def update_job(job_id: str, job_update: JobUpdate):
+def update_job(job_id: str, job_update: JobUpdate):
     """Update a job"""
     db = get_database()
     
-    if not ObjectId.is_valid(job_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid job ID format"
-        )
+    job_oid = parse_object_id(job_id, "job")
     
     update_data = job_update.model_dump(exclude_unset=True)
     
@@ -167,32 +185,15 @@ async def update_job(job_id: str, job_update: JobUpdate):
     
     # Convert userId, clientId, and invoiceId to ObjectId if present in update data
     if update_data.get("userId"):
-        if ObjectId.is_valid(update_data["userId"]):
-            update_data["userId"] = ObjectId(update_data["userId"])
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid user ID format"
-            )
+        update_data["userId"] = parse_object_id(update_data["userId"], "user")
     if update_data.get("clientId"):
         # Handle empty string - remove it from update_data
         if isinstance(update_data["clientId"], str) and not update_data["clientId"].strip():
             update_data.pop("clientId")
-        elif ObjectId.is_valid(update_data["clientId"]):
-            update_data["clientId"] = ObjectId(update_data["clientId"])
         else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid client ID format"
-            )
+            update_data["clientId"] = parse_object_id(update_data["clientId"], "client")
     if update_data.get("invoiceId") and update_data["invoiceId"].strip():
-        if ObjectId.is_valid(update_data["invoiceId"]):
-            update_data["invoiceId"] = ObjectId(update_data["invoiceId"])
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid invoice ID format"
-            )
+        update_data["invoiceId"] = parse_object_id(update_data["invoiceId"], "invoice")
     
     # Build update operation
     update_operation = {}
@@ -207,34 +208,30 @@ async def update_job(job_id: str, job_update: JobUpdate):
             detail="No fields to update"
         )
     
-    result = db.jobs.update_one(
-        {"_id": ObjectId(job_id)},
-        update_operation
+    # Update and get the updated job back in one round-trip
+    updated_job = db.jobs.find_one_and_update(
+        {"_id": job_oid},
+        update_operation,
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_job is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Job not found"
         )
     
-    updated_job = db.jobs.find_one({"_id": ObjectId(job_id)})
-    if updated_job:
-        updated_job = convert_objectid_to_str(updated_job)
+    updated_job = convert_objectid_to_str(updated_job)
     return updated_job
 
 @router.delete("/{job_id}", response_model=MessageResponse)
-async def delete_job(job_id: str):
+def delete_job(job_id: str):
     """Delete a job"""
     db = get_database()
     
-    if not ObjectId.is_valid(job_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid job ID format"
-        )
+    job_oid = parse_object_id(job_id, "job")
     
-    result = db.jobs.delete_one({"_id": ObjectId(job_id)})
+    result = db.jobs.delete_one({"_id": job_oid})
     
     if result.deleted_count == 0:
         raise HTTPException(
@@ -247,63 +244,57 @@ async def delete_job(job_id: str):
 # ===== RELATIONSHIP ENDPOINTS =====
 
 @router.get("/{job_id}/details")
-async def get_job_details(job_id: str):
+def get_job_details(job_id: str):
     """Get job with full details including client, user, and invoice information"""
     db = get_database()
     
-    if not ObjectId.is_valid(job_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid job ID format"
-        )
+    job_oid = parse_object_id(job_id, "job")
     
-    # Get job
-    job = db.jobs.find_one({"_id": ObjectId(job_id)})
+    # Get job with client, user and invoice in one round-trip
+    job = find_job_with_relations(db, job_oid)
     if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Job not found"
         )
+    client = job.pop("_client", None)
+    user = job.pop("_user", None)
+    invoice = job.pop("_invoice", None)
+    
+    # Convert ObjectId and datetime fields to strings for JSON serialization
+    job = convert_objectid_to_str(job)
     
-    # Get client details
+    # Client details
     client_details = None
-    if job.get("clientId"):
-        client = db.clients.find_one({"_id": ObjectId(job["clientId"])})
-        if client:
-            client_details = {
-                "_id": str(client["_id"]),
-                "name": client.get("name"),
-                "email": client.get("email"),
-                "address": client.get("address")
-            }
-    
-    # Get user details
+    if client:
+        client_details = {
+            "_id": str(client["_id"]),
+            "name": client.get("name"),
+            "email": client.get("email"),
+            "address": client.get("address")
+        }
+    
+    # User details
     user_details = None
-    if job.get("userId"):
-        user = db.users.find_one({"_id": ObjectId(job["userId"])})
-        if user:
-            user_details = {
-                "_id": str(user["_id"]),
-                "businessName": user.get("businessName"),
-                "businessEmail": user.get("businessEmail"),
-                "hourlyRate": user.get("hourlyRate")
-            }
-    
-    # Get invoice details if exists
+    if user:
+        user_details = {
+            "_id": str(user["_id"]),
+            "businessName": user.get("businessName"),
+            "businessEmail": user.get("businessEmail"),
+            "hourlyRate": user.get("hourlyRate")
+        }
+    
+    # Invoice details if exists
     invoice_details = None
-    if job.get("invoiceId"):
-        # invoiceId is stored as ObjectId, use it directly
-        invoice_id = job["invoiceId"] if isinstance(job["invoiceId"], ObjectId) else ObjectId(job["invoiceId"])
-        invoice = db.invoices.find_one({"_id": invoice_id})
-        if invoice:
-            invoice_details = {
-                "_id": str(invoice["_id"]),
-                "invoiceNumber": invoice.get("invoiceNumber"),
-                "status": invoice.get("status"),
-                "total": invoice.get("total"),
-                "issueDate": invoice.get("issueDate"),
-                "dueDate": invoice.get("dueDate")
-            }
+    if invoice:
+        invoice_details = {
+            "_id": str(invoice["_id"]),
+            "invoiceNumber": invoice.get("invoiceNumber"),
+            "status": invoice.get("status"),
+            "total": invoice.get("total"),
+            "issueDate": invoice.get("issueDate"),
+            "dueDate": invoice.get("dueDate")
+        }
     
     return {
         "job": job,
@@ -313,31 +304,35 @@ async def get_job_details(job_id: str):
     }
 
 @router.get("/{job_id}/invoice")
-async def get_job_invoice(job_id: str):
+def get_job_invoice(job_id: str):
     """Get the invoice associated with a job"""
     db = get_database()
     
-    if not ObjectId.is_valid(job_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid job ID format"
-        )
-    
-    # Get job
-    job = db.jobs.find_one({"_id": ObjectId(job_id)})
+    job_oid = parse_object_id(job_id, "job")
+    
+    # Get the job's invoice in one round-trip: the job is kept only to tell "no job" from "no invoice"
+    pipeline = [
+        {"$match": {"_id": job_oid}},
+        {"$project": {"_invoiceOid": object_id_expr("$invoiceId")}},
+        {"$lookup": {
+            "from": "invoices",
+            "localField": "_invoiceOid",
+            "foreignField": "_id",
+            "as": "_invoice"
+        }},
+        {"$project": {"_invoice": {"$first": "$_invoice"}}}
+    ]
+    job = next(db.jobs.aggregate(pipeline), None)
     if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Job not found"
         )
     
-    # Get invoice
-    if job.get("invoiceId"):
-        # invoiceId is stored as ObjectId, use it directly
-        invoice_id = job["invoiceId"] if isinstance(job["invoiceId"], ObjectId) else ObjectId(job["invoiceId"])
-        invoice = db.invoices.find_one({"_id": invoice_id})
-        if invoice:
-            return invoice
+    invoice = job.get("_invoice")
+    if invoice:
+        # Convert ObjectId fields to strings for response
+        return convert_objectid_to_str(invoice)
     
     # No invoice found
     raise HTTPException(
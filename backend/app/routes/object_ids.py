@@ -0,0 +1,28 @@
+import re
+from fastapi import HTTPException, status
+from bson import ObjectId
+
+# 24 hex characters: the string form of an ObjectId
+OBJECT_ID_PATTERN = re.compile(r"[0-9a-fA-F]{24}")
+
+def parse_object_id(value, label: str) -> ObjectId:
+    """Convert an ID to ObjectId in one step, raising a 400 if it is not a valid ID"""
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and OBJECT_ID_PATTERN.fullmatch(value):
+        return ObjectId(value)
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Invalid {label} ID format"
+    )
+
+def object_id_expr(field: str):
+    """Aggregation expression: field as an ObjectId, or null if it is missing/empty/invalid"""
+    return {"$convert": {"input": field, "to": "objectId", "onError": None, "onNull": None}}
+
+def object_id_ref(oid: ObjectId):
+    """
+    Query filter matching a reference field to an ID. References are stored as ObjectIds,
+    but older documents may hold the string form, so match either.
+    """
+    return {"$in": [oid, str(oid)]}
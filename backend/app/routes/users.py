@@ -6,6 +6,7 @@ from datetime import datetime
 from ..models import User, UserCreate, UserUpdate, MessageResponse
 from ..database import get_database
 from ..api.dependencies import verify_token
+from .invoices import release_invoice_numbers, invalidate_user_cache
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -81,6 +82,8 @@ def update_profile(profile: User, token: dict = Depends(verify_token)):
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    # Profiles are keyed by auth0 ID here, so drop all cached business details
+    invalidate_user_cache()
         
     return {"msg": "Profile updated successfully"}
 
@@ -180,6 +183,9 @@ async def update_user(user_id: str, user_update: UserUpdate):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    invalidate_user_cache(user_id)
+    if "lastInvoiceNumber" in update_data:
+        release_invoice_numbers(user_id)
     
     # Return updated user
     updated_user = db.users.find_one({"_id": ObjectId(user_id)})
@@ -197,6 +203,8 @@ async def delete_user(user_id: str):
         )
     
     result = db.users.delete_one({"_id": ObjectId(user_id)})
+    release_invoice_numbers(user_id)
+    invalidate_user_cache(user_id)
     
     if result.deleted_count == 0:
         raise HTTPException(